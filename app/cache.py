@@ -0,0 +1,308 @@
+# cache.py
+"""
+Result cache shared by the CLI and the Streamlit UI.
+
+Two tiers:
+  - LRUCache     — per-process, in memory, bounded by item count (and by
+                   total size and age when max_bytes / a TTL is set)
+  - disk store   — shared by every process pointing at the same CACHE_DIR:
+      SQLiteStore  one SQLite file in WAL mode; same host only, because WAL
+                   needs shared memory and does not work on network mounts
+      FileStore    one JSON file per key, written via atomic rename under a
+                   per-key lock file; safe on NFS/SMB mounts shared by replicas
+                   running on different hosts
+
+TieredCache checks memory first, then disk, and promotes disk hits into memory.
+Disk errors are logged and treated as a miss, never as a failed generation.
+Values must be JSON-serializable.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from app.config import Config
+
+_MISSING = object()
+
+logger = logging.getLogger("cache")
+
+# Errors a disk store may raise that should only cost a cache miss
+STORE_ERRORS = (sqlite3.Error, OSError, ValueError)
+
+
+def make_key(namespace, *parts):
+    """Hash `parts` into a stable cache key under `namespace`."""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU; entries older than `ttl_seconds` (if set) are misses.
+    With max_bytes set, values must support len() (e.g. bytes) and the total
+    is kept under max_bytes; a value larger than that is not stored at all.
+    """
+
+    def __init__(self, max_items=256, ttl_seconds=0, max_bytes=0):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _size(self, value):
+        return len(value) if self.max_bytes else 0
+
+    def _pop(self, key):
+        _, value = self._data.pop(key)
+        self.nbytes -= self._size(value)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            created, value = entry
+            if self.ttl_seconds and time.time() - created > self.ttl_seconds:
+                self._pop(key)
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_items <= 0:
+            return
+        size = self._size(value)
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            if self.max_bytes and size > self.max_bytes:
+                return
+            self._data[key] = (time.time(), value)
+            self.nbytes += size
+            while len(self._data) > self.max_items or (self.max_bytes and self.nbytes > self.max_bytes):
+                self._pop(next(iter(self._data)))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteStore:
+    """Disk-backed key/value store, safe for concurrent processes."""
+
+    def __init__(self, path, ttl_seconds=0, timeout=30.0):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call: cheap for SQLite and avoids
+        # sharing a connection across threads.
+        conn = sqlite3.connect(str(self.path), timeout=self.timeout)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key, default=None):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return default
+        value, created = row
+        if self.ttl_seconds and time.time() - created > self.ttl_seconds:
+            self.delete(key)
+            return default
+        return json.loads(value)
+
+    def set(self, key, value):
+        payload = json.dumps(value)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)",
+                (key, payload, time.time()),
+            )
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache")
+
+
+class FileStore:
+    """
+    File-per-key store for cache directories on shared (network) storage.
+
+    Values are written to a temp file in the same directory and moved into
+    place with os.replace(), so readers never see a partial file. A
+    `<key>.lock` file created with O_EXCL keeps two processes from writing the
+    same key at once; the loser skips its write since the winner stores an
+    equivalent value. Locks older than `lock_timeout` are treated as stale.
+    """
+
+    def __init__(self, root, ttl_seconds=0, lock_timeout=30.0):
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.lock_timeout = lock_timeout
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.root / name[:2] / f"{name}.json"
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            if self.ttl_seconds and time.time() - path.stat().st_mtime > self.ttl_seconds:
+                self.delete(key)
+                return default
+            return json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return default
+
+    def set(self, key, value):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lock = path.with_suffix(".lock")
+        if not self._acquire(lock):
+            return
+        try:
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(value, f)
+                os.replace(tmp, path)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+        finally:
+            lock.unlink(missing_ok=True)
+
+    def _acquire(self, lock):
+        for _ in range(2):
+            try:
+                os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - lock.stat().st_mtime < self.lock_timeout:
+                        return False
+                    lock.unlink()
+                except FileNotFoundError:
+                    pass
+        return False
+
+    def delete(self, key):
+        self._path(key).unlink(missing_ok=True)
+
+    def clear(self):
+        for path in self.root.glob("*/*.json"):
+            path.unlink(missing_ok=True)
+
+
+class TieredCache:
+    """In-process LRU in front of a shared on-disk store."""
+
+    def __init__(self, memory, store=None, enabled=True):
+        self.memory = memory
+        self.store = store
+        self.enabled = enabled
+
+    def get(self, key, default=None):
+        if not self.enabled:
+            return default
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.store is not None:
+            try:
+                value = self.store.get(key, _MISSING)
+            except STORE_ERRORS as e:
+                logger.warning(f"Cache read failed, treating as miss: {e}")
+                value = _MISSING
+            if value is not _MISSING:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        self.memory.set(key, value)
+        if self.store is not None:
+            try:
+                self.store.set(key, value)
+            except STORE_ERRORS as e:
+                logger.warning(f"Cache write failed, keeping result in memory only: {e}")
+
+    def get_or_compute(self, key, compute, refresh=False):
+        """
+        Return the cached value for `key`, computing and storing it on a miss.
+        refresh=True skips the lookup and overwrites the entry with a fresh result.
+        """
+        value = _MISSING if refresh else self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        self.memory.clear()
+        if self.store is not None:
+            self.store.clear()
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache configured from Config (created on first use)."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            store = None
+            if Config.CACHE_ENABLED:
+                try:
+                    if Config.CACHE_BACKEND == "files":
+                        store = FileStore(Config.CACHE_DIR / "files", ttl_seconds=Config.CACHE_TTL_SECONDS)
+                    else:
+                        store = SQLiteStore(Config.CACHE_DIR / Config.CACHE_DB, ttl_seconds=Config.CACHE_TTL_SECONDS)
+                except STORE_ERRORS as e:
+                    logger.warning(f"Disk cache unavailable, using memory only: {e}")
+            _default_cache = TieredCache(
+                LRUCache(Config.CACHE_MEMORY_ITEMS, ttl_seconds=Config.CACHE_TTL_SECONDS),
+                store,
+                enabled=Config.CACHE_ENABLED,
+            )
+        return _default_cache
@@ -0,0 +1,220 @@
+# concurrency.py
+"""
+Adaptive (AIMD) concurrency control for model calls.
+
+AdaptiveLimiter caps in-flight requests at `limit` and moves that limit from
+what it observes:
+  - success under the latency target  -> additive increase (+increase/limit,
+                                         i.e. roughly +increase per full window)
+  - 429 / 5xx / timeout / slow reply  -> multiplicative decrease (x decrease),
+                                         at most once per cooldown so a burst
+                                         of errors from one overload counts once;
+                                         no increases during that cooldown either
+Other errors (bad JSON, 400s) say nothing about capacity and are ignored.
+
+snapshot() exposes the current limit, in-flight count, recent latencies and
+outcome counters for the UI/CLI.
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+OK = "ok"
+THROTTLED = "throttled"
+SERVER_ERROR = "server_error"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+CONGESTION = {THROTTLED, SERVER_ERROR, TIMEOUT}
+
+_THROTTLE_NAMES = {"ResourceExhausted", "TooManyRequests"}
+_SERVER_NAMES = {"ServiceUnavailable", "InternalServerError", "BadGateway"}
+_TIMEOUT_NAMES = {"DeadlineExceeded", "GatewayTimeout", "TimeoutError", "ReadTimeout"}
+
+# Decrease cooldown before any successful round-trip has been measured
+_MIN_COOLDOWN = 0.1
+
+# Retry backoff: base delay per attempt and an upper bound, in seconds
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+
+def classify_error(exc):
+    """Map an exception to THROTTLED, SERVER_ERROR, TIMEOUT or ERROR."""
+    status = getattr(exc, "status", None) or getattr(exc, "code", None)
+    name = type(exc).__name__
+    if status == 429 or name in _THROTTLE_NAMES:
+        return THROTTLED
+    if isinstance(exc, TimeoutError) or status in (408, 504) or name in _TIMEOUT_NAMES:
+        return TIMEOUT
+    if (isinstance(status, int) and status >= 500) or name in _SERVER_NAMES:
+        return SERVER_ERROR
+    return ERROR
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial=4, min_limit=1, max_limit=32, target_latency=None,
+                 increase=1.0, decrease=0.5, cooldown=None, window=100):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.inflight = 0
+        self.latencies = deque(maxlen=window)
+        self.counts = {OK: 0, THROTTLED: 0, SERVER_ERROR: 0, TIMEOUT: 0, ERROR: 0}
+        self.decreases = 0
+        self._last_decrease = float("-inf")
+        self._last_ok_latency = 0.0
+        self._retries_waiting = 0
+        self._cond = threading.Condition()
+
+    # -- slots -----------------------------------------------------------------
+
+    def acquire(self, retry=False):
+        """
+        Block until a slot is free. Retries (retry=True) go ahead of new
+        requests, so a throttled request is not starved by fresh arrivals.
+        """
+        with self._cond:
+            if retry:
+                self._retries_waiting += 1
+                try:
+                    while self.inflight >= int(self.limit):
+                        self._cond.wait()
+                finally:
+                    self._retries_waiting -= 1
+            else:
+                while self.inflight >= int(self.limit) or self._retries_waiting:
+                    self._cond.wait()
+            self.inflight += 1
+
+    def try_acquire(self):
+        """Take a slot only if one is free right now; returns True on success."""
+        with self._cond:
+            if self.inflight >= int(self.limit):
+                return False
+            self.inflight += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self.inflight -= 1
+            self._cond.notify_all()
+
+    def slot(self, retry=False):
+        """Context manager holding one slot; see acquire()."""
+        return _Slot(self, retry)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+    # -- feedback --------------------------------------------------------------
+
+    def observe(self, latency, outcome=OK):
+        """Feed one attempt's latency and outcome back into the limit."""
+        with self._cond:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+            if outcome == ERROR:
+                return
+            self.latencies.append(latency)
+
+            slow = self.target_latency is not None and latency > self.target_latency
+            if outcome in CONGESTION or slow:
+                self._decrease()
+            else:
+                self._last_ok_latency = latency
+                # Successes of requests admitted before the last decrease say
+                # nothing about the new limit, so hold off for one cooldown.
+                if time.monotonic() - self._last_decrease >= self._cooldown():
+                    self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+            self._cond.notify_all()
+
+    def _cooldown(self):
+        # Default cooldown: one successful round-trip, so a single overload
+        # episode (many 429s at once) only halves the limit once. Until the
+        # first success, fall back to the latency target or a small floor.
+        if self.cooldown is not None:
+            return self.cooldown
+        return self._last_ok_latency or self.target_latency or _MIN_COOLDOWN
+
+    def backoff(self, attempt):
+        """
+        Jittered delay before retry number `attempt` (1-based) after congestion:
+        exponential from BACKOFF_BASE, capped at BACKOFF_MAX. It does not use the
+        latency target, which can be tens of seconds for slow tiers.
+        """
+        return random.uniform(0.5, 1.0) * min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < self._cooldown():
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease)
+        self.decreases += 1
+
+    # -- metrics ---------------------------------------------------------------
+
+    def snapshot(self):
+        with self._cond:
+            recent = sorted(self.latencies)
+            return {
+                "limit": round(self.limit, 2),
+                "inflight": self.inflight,
+                "p50_latency_s": _percentile(recent, 0.50),
+                "p95_latency_s": _percentile(recent, 0.95),
+                "decreases": self.decreases,
+                **self.counts,
+            }
+
+
+class _Slot:
+    __slots__ = ("limiter", "retry")
+
+    def __init__(self, limiter, retry):
+        self.limiter = limiter
+        self.retry = retry
+
+    def __enter__(self):
+        self.limiter.acquire(retry=self.retry)
+        return self.limiter
+
+    def __exit__(self, *exc):
+        self.limiter.release()
+        return False
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def run_batch(fn, items, max_workers):
+    """
+    Apply `fn` to every item on a thread pool, preserving order.
+    Returns a list of (result, error) pairs; error is None on success.
+    Pair this with an AdaptiveLimiter inside `fn` to bound real concurrency.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    def call(item):
+        try:
+            return fn(item), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as pool:
+        return list(pool.map(call, items))
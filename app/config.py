@@ -3,11 +3,25 @@ Configuration for AI Test Case Generator (Gemini-ready)
 No side-effects on import. Call Config.ensure_dirs() explicitly when needed.
 """
 import os
-from dotenv import load_dotenv
 from pathlib import Path
 
-# Load environment variables from .env
-load_dotenv()
+
+def _load_env():
+    """Load the nearest .env (app/ or repo root); python-dotenv is only imported if one exists."""
+    here = Path(__file__).parent.resolve()
+    for candidate in (here / ".env", here.parent / ".env"):
+        if candidate.is_file():
+            from dotenv import load_dotenv
+            load_dotenv(candidate)
+            return
+
+def _model_list(name: str, default: str):
+    """Comma-separated model list from the environment, duplicates removed."""
+    models = [m.strip() for m in os.getenv(name, default).split(",") if m.strip()]
+    return list(dict.fromkeys(models))
+
+# Load environment variables from .env (module import runs once per process)
+_load_env()
 
 class Config:
     BASE_DIR = Path(__file__).parent.resolve()
@@ -18,27 +32,72 @@ class Config:
     GEMINI_TEMPERATURE = float(os.getenv("GEMINI_TEMPERATURE", "0.7"))
     GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
 
+    # Model routing: "fast" tier for scenario listing/improvement, "strong" tier
+    # for testcase expansion. Models are tried in order; the rest are failovers.
+    MODEL_BACKEND = os.getenv("MODEL_BACKEND", "gemini").strip().lower()  # gemini | fake
+    FAST_MODELS = _model_list("GEMINI_FAST_MODELS", f"gemini-2.5-flash-lite,{GEMINI_MODEL}")
+    STRONG_MODELS = _model_list("GEMINI_STRONG_MODELS", f"gemini-2.5-pro,{GEMINI_MODEL}")
+    # Concurrency starts at *_CONCURRENCY and adapts (AIMD) up to *_MAX_CONCURRENCY,
+    # backing off on 429/5xx/timeouts or replies slower than *_TARGET_LATENCY.
+    FAST_CONCURRENCY = int(os.getenv("FAST_CONCURRENCY", "8"))
+    STRONG_CONCURRENCY = int(os.getenv("STRONG_CONCURRENCY", "4"))
+    FAST_MAX_CONCURRENCY = int(os.getenv("FAST_MAX_CONCURRENCY", "32"))
+    STRONG_MAX_CONCURRENCY = int(os.getenv("STRONG_MAX_CONCURRENCY", "16"))
+    FAST_TARGET_LATENCY = float(os.getenv("FAST_TARGET_LATENCY", "15"))
+    STRONG_TARGET_LATENCY = float(os.getenv("STRONG_TARGET_LATENCY", "45"))
+    FAST_TIMEOUT = float(os.getenv("FAST_TIMEOUT", "30"))
+    STRONG_TIMEOUT = float(os.getenv("STRONG_TIMEOUT", "90"))
+    # Rough cost estimate per 1000 prompt+response characters, for accounting only
+    FAST_COST_PER_1K_CHARS = float(os.getenv("FAST_COST_PER_1K_CHARS", "0.00003"))
+    STRONG_COST_PER_1K_CHARS = float(os.getenv("STRONG_COST_PER_1K_CHARS", "0.0003"))
+    MODEL_COOLDOWN_SECONDS = float(os.getenv("MODEL_COOLDOWN_SECONDS", "30"))
+
     # App settings
     DEFAULT_NUM_SCENARIOS = int(os.getenv("DEFAULT_NUM_SCENARIOS", "10"))
     MIN_SCENARIOS = int(os.getenv("MIN_SCENARIOS", "5"))
     MAX_SCENARIOS = int(os.getenv("MAX_SCENARIOS", "30"))
+    IMPROVE_SCENARIOS = os.getenv("IMPROVE_SCENARIOS", "off").strip().lower()  # off | flagged | all
+
+    # Export settings (compression: stored | deflated | bzip2 | lzma)
+    EXPORT_ZIP_COMPRESSION = os.getenv("EXPORT_ZIP_COMPRESSION", "deflated").strip().lower()
+    EXPORT_ZIP_LEVEL = int(os.getenv("EXPORT_ZIP_LEVEL", "6"))
+    # Memory kept for recently built ZIP bundles, per process (0 = don't keep any)
+    EXPORT_BUNDLE_CACHE_MB = float(os.getenv("EXPORT_BUNDLE_CACHE_MB", "32"))
 
     # Directories (expect `samples/` at repo root)
     SAMPLES_DIR = BASE_DIR / "samples"
     OUTPUT_DIR = BASE_DIR / "outputs"
     EXPORTS_DIR = OUTPUT_DIR / "exports"
 
+    # Result cache (in-process LRU + disk store shared across processes).
+    # CACHE_BACKEND=sqlite shares results between processes on one host;
+    # use CACHE_BACKEND=files when CACHE_DIR is a network mount shared by hosts.
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite").strip().lower()  # sqlite | files
+    CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+    CACHE_DIR = Path(os.getenv("CACHE_DIR", str(OUTPUT_DIR / "cache")))
+    CACHE_DB = "results.sqlite3"
+    CACHE_MEMORY_ITEMS = int(os.getenv("CACHE_MEMORY_ITEMS", "256"))
+    CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "0"))  # 0 = never expire
+
     # Filenames
     TESTCASES_OUTPUT = "testcases_output.json"
     TESTCASES_CLEAN = "testcases_clean.json"
     SCENARIOS_OUTPUT = "generated_scenarios.txt"
     RAW_RESPONSES_LOG = "gpt_raw_responses.txt"  # generic name; still used for responses
 
+    _dirs_ready = False
+
     @classmethod
     def ensure_dirs(cls):
+        # Cheap to call repeatedly (e.g. on every Streamlit rerun): only the
+        # first call per process touches the filesystem.
+        if cls._dirs_ready:
+            return
         cls.SAMPLES_DIR.mkdir(parents=True, exist_ok=True)
         cls.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
         cls.EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+        cls.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cls._dirs_ready = True
 
     @classmethod
     def get_sample_path(cls, filename: str):
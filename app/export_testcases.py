@@ -1,42 +1,152 @@
 # export_testcases.py
-import json
+import io
 import csv
+import json
+import hashlib
+import zipfile
 from pathlib import Path
 from app.config import Config
+from app.cache import LRUCache
+from app.models import TestcaseColumns, as_columns, parse_testcases
+
+
+# -----------------------------------------------------------------------------
+# Format writers — each one streams into an open text handle
+# -----------------------------------------------------------------------------
+
+# Writers take a TestcaseColumns view (see models.as_columns).
+
+def write_json(cols, f):
+    json.dump([tc.to_dict() for tc in cols.records], f, indent=4)
+
+def write_csv(cols, f):
+    w = csv.writer(f)
+    w.writerow(["Title", "Preconditions", "Steps"])
+    for i in range(len(cols)):
+        contents, expected = cols.steps_of(i)
+        steps = "\n".join(
+            f"{n}. {c} → {e}" for n, (c, e) in enumerate(zip(contents, expected), 1)
+        )
+        w.writerow([cols.titles[i], cols.preconds[i], steps])
+
+def write_md(cols, f):
+    f.write("# Test Cases\n\n")
+    for i in range(len(cols)):
+        f.write(f"## {cols.titles[i]}\n")
+        f.write(f"**Preconditions:** {cols.preconds[i]}\n\n")
+        f.write("**Steps:**\n")
+        for c, e in zip(*cols.steps_of(i)):
+            f.write(f"- {c} → *{e}*\n")
+        f.write("\n---\n")
+
+def write_summary(cols, f):
+    f.write(f"Generated {len(cols)} testcases with {cols.total_steps} steps.")
+
+# name inside the bundle -> (writer, newline passed to the text wrapper)
+FORMATS = {
+    "JSON": ("testcases.json", write_json, None),
+    "CSV": ("testcases.csv", write_csv, ""),
+    "Markdown": ("testcases.md", write_md, None),
+}
+
+COMPRESSION = {
+    "stored": zipfile.ZIP_STORED,
+    "deflated": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+
+
+# -----------------------------------------------------------------------------
+# ZIP bundle — built once per distinct set of testcases
+# -----------------------------------------------------------------------------
+
+# Bounded by total size, not count: a few large suites must not pin
+# several full ZIPs in every UI process.
+_BUNDLE_CACHE = LRUCache(
+    max_items=8 if Config.EXPORT_BUNDLE_CACHE_MB > 0 else 0,
+    max_bytes=max(1, int(Config.EXPORT_BUNDLE_CACHE_MB * 1024 * 1024)),
+)
 
 
+def testcases_digest(data):
+    """Stable content hash of a list of testcases."""
+    h = hashlib.sha256()
+    for tc in data:
+        h.update(tc.digest.encode("ascii"))
+    return h.hexdigest()
+
+def write_zip(data, fileobj, formats=None, compression=None, compresslevel=None):
+    """Stream every requested format straight into a ZIP written to `fileobj`."""
+    cols = as_columns(data)
+    formats = list(FORMATS) if formats is None else formats
+    compression = compression or Config.EXPORT_ZIP_COMPRESSION
+    if compresslevel is None:
+        compresslevel = Config.EXPORT_ZIP_LEVEL
+
+    with zipfile.ZipFile(fileobj, "w", compression=COMPRESSION[compression],
+                         compresslevel=compresslevel) as z:
+        for fmt in formats:
+            name, writer, newline = FORMATS[fmt]
+            with z.open(name, "w") as raw, \
+                    io.TextIOWrapper(raw, encoding="utf-8", newline=newline) as f:
+                writer(cols, f)
+        with z.open("summary.txt", "w") as raw, io.TextIOWrapper(raw, encoding="utf-8") as f:
+            write_summary(cols, f)
+
+def build_zip_bundle(data, formats=None, compression=None, compresslevel=None):
+    """
+    Return the ZIP bundle for `data` as bytes.
+    Bundles are cached by content hash (up to EXPORT_BUNDLE_CACHE_MB in
+    total), so repeated downloads are free.
+    """
+    # The key only needs the records; the columnar view is built on a miss.
+    records = data.records if isinstance(data, TestcaseColumns) else parse_testcases(data)
+    formats = tuple(FORMATS) if formats is None else tuple(formats)
+    key = (testcases_digest(records), formats, compression, compresslevel)
+
+    cached = _BUNDLE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    buffer = io.BytesIO()
+    write_zip(data if isinstance(data, TestcaseColumns) else records,
+              buffer, formats, compression, compresslevel)
+    bundle = buffer.getvalue()
+    buffer.close()
+
+    _BUNDLE_CACHE.set(key, bundle)
+    return bundle
+
+
+# -----------------------------------------------------------------------------
+# Disk exports (CLI pipeline)
+# -----------------------------------------------------------------------------
+
 def export_json(data):
     out = Path(Config.get_exports_dir()) / "testcases.json"
-    out.write_text(json.dumps(data, indent=4), encoding="utf-8")
+    with out.open("w", encoding="utf-8") as f:
+        write_json(as_columns(data), f)
     print("[OK] Exported JSON →", out)
 
 def export_csv(data):
     out = Path(Config.get_exports_dir()) / "testcases.csv"
     with out.open("w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(["Title", "Preconditions", "Steps"])
-        for tc in data:
-            steps = "\n".join(
-                f"{i+1}. {step.get('content','')} → {step.get('expected','')}"
-                for i, step in enumerate(tc.get("custom_steps_separated", []))
-            )
-            w.writerow([tc.get("title",""), tc.get("custom_preconds", ""), steps])
-
+        write_csv(as_columns(data), f)
     print("[OK] Exported CSV →", out)
 
 def export_md(data):
     out = Path(Config.get_exports_dir()) / "testcases.md"
-    md = "# Test Cases\n\n"
-    for tc in data:
-        md += f"## {tc.get('title','No Title')}\n"
-        md += f"**Preconditions:** {tc.get('custom_preconds', '')}\n\n"
-        md += "**Steps:**\n"
-        for step in tc.get("custom_steps_separated", []):
-            md += f"- {step.get('content','')} → *{step.get('expected','')}*\n"
-        md += "\n---\n"
-    out.write_text(md, encoding="utf-8")
+    with out.open("w", encoding="utf-8") as f:
+        write_md(as_columns(data), f)
     print("[OK] Exported Markdown →", out)
 
+def export_zip(data):
+    out = Path(Config.get_exports_dir()) / "testcases_bundle.zip"
+    with out.open("wb") as f:
+        write_zip(data, f)
+    print("[OK] Exported ZIP →", out)
+
 def main():
     print("=== EXPORT TESTCASES ===")
     Config.ensure_dirs()
@@ -45,13 +155,14 @@ def main():
         print("❌ No cleaned JSON found:", clean_path)
         return
 
-    data = json.loads(clean_path.read_text())
+    data = as_columns(json.loads(clean_path.read_text()))
     exports_dir = Path(Config.get_exports_dir())
     exports_dir.mkdir(parents=True, exist_ok=True)
 
     export_json(data)
     export_csv(data)
     export_md(data)
+    export_zip(data)
 
     print("[OK] Done Exporting")
 
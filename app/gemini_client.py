@@ -0,0 +1,29 @@
+# gemini_client.py
+"""
+Lazy, once-per-process access to the Gemini SDK.
+
+google.generativeai is slow to import, so nothing imports it at module level;
+the first call to get_genai() imports and configures it, later calls are free.
+Streamlit re-executes the app script on every interaction, but this module
+stays in sys.modules, so the setup really does run once per process.
+"""
+import threading
+from functools import lru_cache
+from app.config import Config
+
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_genai():
+    """Import and configure google.generativeai on first use."""
+    with _lock:
+        import google.generativeai as genai
+        genai.configure(api_key=Config.GEMINI_API_KEY)
+        return genai
+
+
+@lru_cache(maxsize=32)
+def get_model(model_name):
+    """Cached GenerativeModel handle for `model_name`."""
+    return get_genai().GenerativeModel(model_name)
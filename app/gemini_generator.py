@@ -1,9 +1,11 @@
 # gemini_generator.py
 import json
 from pathlib import Path
-import google.generativeai as genai
-import sys
 from app.config import Config
+from app.cache import get_cache, make_key
+from app.model_router import get_router
+from app.improve_scenarios import improve_scenarios
+from app.concurrency import run_batch
 
 def load_context():
     path = Path(Config.BASE_DIR) / "samples" / "context.txt"
@@ -21,7 +23,7 @@ def save_raw_testcases(testcases):
     out.write_text(json.dumps(testcases, indent=4), encoding="utf-8")
     print(f"[OK] Raw testcases saved → {out}")
 
-def generate_scenarios(model, context, num=10):
+def generate_scenarios(router, context, num=10, temperature=Config.GEMINI_TEMPERATURE):
     prompt = f"""
 Generate {num} QA test scenarios.
 
@@ -32,14 +34,13 @@ Rules:
 - Only numbered scenarios (1., 2., 3.)
 - One scenario per line
 """
-    response = model.generate_content(prompt)
-    text = getattr(response, "text", "") or ""
+    text = router.generate("scenarios", prompt, temperature=temperature)
     lines = [line.strip() for line in text.splitlines() if line.strip() and line.strip()[0].isdigit()]
     if not lines:
         raise RuntimeError("No scenarios returned from Gemini.")
     return lines
 
-def generate_testcase(model, scenario, context):
+def generate_testcase(router, scenario, context, temperature=Config.GEMINI_TEMPERATURE):
     prompt = f"""
 Create a QA test case in JSON format.
 
@@ -53,37 +54,72 @@ Rules:
 - Only JSON output
 - Must include title, custom_preconds, priority_id, custom_steps_separated[]
 """
-    response = model.generate_content(prompt, generation_config={"response_mime_type":"application/json"})
-    text = getattr(response, "text", "") or ""
+    text = router.generate("testcase", prompt, json_output=True, temperature=temperature)
     try:
         return json.loads(text)
     except Exception as e:
         raise RuntimeError("Invalid JSON returned for scenario:\n" + scenario + "\nError: " + str(e))
 
+def print_router_stats(router):
+    for tier, lim in router.limits().items():
+        print(f"[{tier}] concurrency limit {lim['limit']} (p50 {lim['p50_latency_s']:.2f}s, "
+              f"p95 {lim['p95_latency_s']:.2f}s, {lim['throttled']} throttled, "
+              f"{lim['server_error']} 5xx, {lim['timeout']} timeouts)")
+    for tier, models in router.stats().items():
+        for model, st in models.items():
+            if st["calls"]:
+                print(f"[{tier}] {model}: {st['calls']} calls, {st['failures']} failed, "
+                      f"avg {st['avg_latency_s']:.2f}s, est. ${st['est_cost']:.4f}")
+
 def main():
     print("=== GEMINI GENERATOR ===")
     Config.ensure_dirs()
-    genai.configure(api_key=Config.GEMINI_API_KEY)
-    model_name = Config.GEMINI_MODEL
-    model = genai.GenerativeModel(model_name)
+    router = get_router()
 
     context = load_context()
 
+    cache = get_cache()
+
     print("Generating scenarios...")
-    scenarios = generate_scenarios(model, context, num=Config.DEFAULT_NUM_SCENARIOS)
+    scenarios = cache.get_or_compute(
+        make_key("cli.scenarios", router.cache_scope("scenarios"), Config.GEMINI_TEMPERATURE, context, Config.DEFAULT_NUM_SCENARIOS),
+        lambda: generate_scenarios(router, context, num=Config.DEFAULT_NUM_SCENARIOS),
+    )
+
+    if Config.IMPROVE_SCENARIOS in ("flagged", "all"):
+        print(f"Improving scenarios ({Config.IMPROVE_SCENARIOS})...")
+        scenarios, changed, errors = improve_scenarios(
+            router, context, scenarios,
+            only_flagged=Config.IMPROVE_SCENARIOS == "flagged",
+            temperature=Config.GEMINI_TEMPERATURE,
+        )
+        print(f"[OK] Improved {len(changed)} scenario(s)")
+        for err in errors:
+            print("❌ Improve failed:", err["scenario"])
+            print(err["error"])
+
     save_scenarios(scenarios)
 
     print("Generating testcases...")
+    tier = router.tier_for("testcase")
+
+    def build(sc):
+        return cache.get_or_compute(
+            make_key("cli.testcase", router.cache_scope("testcase"), Config.GEMINI_TEMPERATURE, context, sc),
+            lambda: generate_testcase(router, sc, context),
+        )
+
+    # The tier's adaptive limiter decides how many of these are actually in flight.
     testcases = []
-    for sc in scenarios:
-        try:
-            tc = generate_testcase(model, sc, context)
-            testcases.append(tc)
-        except Exception as e:
+    for sc, (tc, err) in zip(scenarios, run_batch(build, scenarios, tier.limiter.max_limit)):
+        if err is not None:
             print("❌ Failed:", sc)
-            print(e)
+            print(err)
+            continue
+        testcases.append(tc)
 
     save_raw_testcases(testcases)
+    print_router_stats(router)
     print("=== DONE ===")
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+# improve_scenarios.py
+"""
+Batch "Improve Scenario" stage.
+
+Rewrites every scenario (or only those flagged by the validation/quality
+checks) through improve_scenario_prompt on the router's fast tier. Requests
+run concurrently under the tier's adaptive concurrency limit, and each
+result is cached by context + scenario text, so re-running over an edited
+list only pays for the scenarios that actually changed.
+"""
+import re
+from app.cache import get_cache, make_key
+from app.concurrency import run_batch
+from app.utils.prompts import improve_scenario_prompt
+from app.utils.validations import check_scenario_quality
+
+
+def flag_scenarios(scenarios):
+    """Return {index: reason} for scenarios that fail the quality checks."""
+    flagged = {}
+    for i, sc in enumerate(scenarios):
+        if not sc.strip():
+            continue
+        ok, reason = check_scenario_quality(sc)
+        if not ok:
+            flagged[i] = reason
+    return flagged
+
+
+def clean_improved(text):
+    """Reduce a model reply to a single scenario line."""
+    lines = [line.strip() for line in text.strip().splitlines() if line.strip()]
+    if not lines:
+        return ""
+    line = re.sub(r"^\s*(\d+[.)]|[-*•])\s*", "", lines[0])
+    return line.strip().strip('"').strip()
+
+
+def improve_scenario(router, context, scenario, temperature=0.2):
+    """
+    Improve one scenario (cached); falls back to the original on an empty reply.
+    Any leading list number ("3. ") is kept so numbered CLI output stays numbered.
+    """
+    numbering = re.match(r"^\s*\d+[.)]\s*", scenario)
+    prefix = numbering.group(0) if numbering else ""
+    body = scenario[len(prefix):]
+
+    prompt = improve_scenario_prompt(context, body)
+    improved = get_cache().get_or_compute(
+        make_key("improve", router.cache_scope("improve"), temperature, context, body),
+        lambda: clean_improved(router.generate("improve", prompt, temperature=temperature)),
+    )
+    return prefix + improved if improved else scenario
+
+
+def improve_scenarios(router, context, scenarios, only_flagged=True, temperature=0.2):
+    """
+    Improve a list of scenarios in one pass.
+    Returns (improved_list, changed_indices, errors) where errors is a list of
+    {"scenario", "error"} dicts; failed scenarios are kept unchanged.
+    """
+    if only_flagged:
+        targets = sorted(flag_scenarios(scenarios))
+    else:
+        targets = list(range(len(scenarios)))
+
+    improved = list(scenarios)
+    changed, errors = [], []
+    if not targets:
+        return improved, changed, errors
+
+    results = run_batch(
+        lambda i: improve_scenario(router, context, scenarios[i], temperature),
+        targets,
+        router.tier_for("improve").limiter.max_limit,
+    )
+    for i, (result, err) in zip(targets, results):
+        if err is not None:
+            errors.append({"scenario": scenarios[i], "error": str(err)})
+        elif result != scenarios[i]:
+            improved[i] = result
+            changed.append(i)
+
+    return improved, changed, errors
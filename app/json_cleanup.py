@@ -6,6 +6,7 @@ ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(ROOT))
 
 from app.config import Config
+from app.models import dedupe, parse_testcases
 
 
 
@@ -19,13 +20,12 @@ def main():
 
     raw_data = json.loads(raw_path.read_text())
 
-    clean = []
-    for tc in raw_data:
-        if isinstance(tc, dict) and "title" in tc:
-            clean.append(tc)
+    clean = dedupe(parse_testcases(
+        tc for tc in raw_data if isinstance(tc, dict) and "title" in tc
+    ))
 
     out = Path(Config.OUTPUT_DIR) / "testcases_clean.json"
-    out.write_text(json.dumps(clean, indent=4), encoding="utf-8")
+    out.write_text(json.dumps([tc.to_dict() for tc in clean], indent=4), encoding="utf-8")
 
     print(f"[OK] Clean JSON saved → {out}")
 
@@ -0,0 +1,328 @@
+# model_router.py
+"""
+Tiered model routing.
+
+Each task is sent to a tier:
+  - fast    — cheap, high-volume work (scenario lists, scenario improvement)
+  - strong  — testcase expansion
+
+A tier holds an ordered list of models, its own adaptive concurrency limit
+(see concurrency.AdaptiveLimiter) and its own latency/cost accounting.
+
+A 429, 5xx or timeout first shrinks the tier's limit; the request then waits
+for a slot and retries the same model (up to GEMINI_MAX_RETRIES times). Only
+a request running out of retries on a model, or a reply slower than the tier
+timeout, puts that model on a short cooldown, so the next requests fail over
+to the next model; the other tier's models are the last resort.
+Set MODEL_BACKEND=fake to exercise everything without an API key.
+"""
+import json
+import re
+import threading
+import time
+from app.config import Config
+from app.concurrency import AdaptiveLimiter, CONGESTION, ERROR, OK, classify_error
+
+TASK_TIERS = {
+    "scenarios": "fast",
+    "improve": "fast",
+    "testcase": "strong",
+}
+
+class ModelUnavailableError(RuntimeError):
+    """Raised by backends when a model is throttled, overloaded or timed out."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def is_retryable(exc):
+    """True for errors another model may not have: throttling, 5xx, timeouts."""
+    return isinstance(exc, ModelUnavailableError) or classify_error(exc) != ERROR
+
+
+# -----------------------------------------------------------------------------
+# Backends
+# -----------------------------------------------------------------------------
+
+class GeminiBackend:
+    """Calls the real Gemini API (SDK imported lazily by gemini_client)."""
+
+    def generate(self, model_name, prompt, json_output=False, temperature=0.2, timeout=None):
+        from app.gemini_client import get_model
+
+        generation_config = {"temperature": temperature}
+        if json_output:
+            generation_config["response_mime_type"] = "application/json"
+        request_options = {"timeout": timeout} if timeout else None
+
+        resp = get_model(model_name).generate_content(
+            prompt,
+            generation_config=generation_config,
+            request_options=request_options,
+        )
+        return getattr(resp, "text", "") or ""
+
+
+class FakeBackend:
+    """
+    Local stand-in for Gemini.
+
+    responder(model_name, prompt, json_output) -> str overrides the canned
+    replies; `latency` (seconds, or {model: seconds}) simulates slow models;
+    `failing` is a set of model names that always answer with a 429;
+    `capacity` (int, or {model: int}) simulates provider throttling: calls
+    beyond that many concurrent requests to one model get a 429.
+    """
+
+    def __init__(self, responder=None, latency=0.0, failing=(), capacity=None):
+        self.responder = responder or self._canned
+        self.latency = latency
+        self.failing = set(failing)
+        self.capacity = capacity
+        self.calls = []
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _per_model(self, value, model_name, default):
+        return value.get(model_name, default) if isinstance(value, dict) else value
+
+    def generate(self, model_name, prompt, json_output=False, temperature=0.2, timeout=None):
+        capacity = self._per_model(self.capacity, model_name, None)
+        with self._lock:
+            self.calls.append(model_name)
+            inflight = self._inflight.get(model_name, 0) + 1
+            self._inflight[model_name] = inflight
+        try:
+            delay = self._per_model(self.latency, model_name, 0.0)
+            if capacity is not None and inflight > capacity:
+                time.sleep(delay / 10)
+                raise ModelUnavailableError(f"{model_name}: 429 too many concurrent requests", status=429)
+            if delay:
+                time.sleep(delay)
+            if model_name in self.failing:
+                raise ModelUnavailableError(f"{model_name}: 429 resource exhausted", status=429)
+            return self.responder(model_name, prompt, json_output)
+        finally:
+            with self._lock:
+                self._inflight[model_name] -= 1
+
+    @staticmethod
+    def _canned(model_name, prompt, json_output):
+        if json_output:
+            scenario = re.search(r'SCENARIO:\s*"""(.*?)"""', prompt, re.DOTALL)
+            title = scenario.group(1).strip() if scenario else "Sample testcase"
+            return json.dumps({
+                "title": title,
+                "priority_id": 2,
+                "custom_preconds": "User is logged in",
+                "custom_steps_separated": [
+                    {"content": "Open the module", "expected": "Module is displayed"},
+                    {"content": "Perform the action", "expected": "Action succeeds"},
+                ],
+            })
+        num = re.search(r"Generate (\d+)", prompt)
+        if num:
+            return "\n".join(f"{i}. Verify behaviour {i} of the module" for i in range(1, int(num.group(1)) + 1))
+        return "Verify the module handles the described input correctly"
+
+
+# -----------------------------------------------------------------------------
+# Accounting
+# -----------------------------------------------------------------------------
+
+class ModelStats:
+    """Per-model counters; cost is estimated from prompt/response size."""
+
+    def __init__(self, cost_per_1k_chars):
+        self.cost_per_1k_chars = cost_per_1k_chars
+        self.calls = 0
+        self.failures = 0
+        self.slow = 0
+        self.latency_total = 0.0
+        self.chars = 0
+        self.cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency, chars, ok, slow=False):
+        with self._lock:
+            self.calls += 1
+            self.latency_total += latency
+            self.chars += chars
+            if not ok:
+                self.failures += 1
+            if slow:
+                self.slow += 1
+
+    def cool_down(self, seconds):
+        with self._lock:
+            self.cooldown_until = time.monotonic() + seconds
+
+    def available(self):
+        return time.monotonic() >= self.cooldown_until
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "slow": self.slow,
+                "avg_latency_s": self.latency_total / self.calls if self.calls else 0.0,
+                "est_cost": self.chars / 1000 * self.cost_per_1k_chars,
+                "cooling_down": not self.available(),
+            }
+
+
+class Tier:
+    def __init__(self, name, models, concurrency, timeout, cost_per_1k_chars,
+                 max_concurrency=None, target_latency=None):
+        if not models:
+            raise ValueError(f"Tier '{name}' has no models configured.")
+        self.name = name
+        self.models = list(models)
+        self.timeout = timeout
+        self.limiter = AdaptiveLimiter(
+            initial=concurrency,
+            max_limit=max_concurrency or concurrency,
+            target_latency=target_latency,
+        )
+        self.stats = {m: ModelStats(cost_per_1k_chars) for m in self.models}
+
+
+# -----------------------------------------------------------------------------
+# Router
+# -----------------------------------------------------------------------------
+
+class ModelRouter:
+    def __init__(self, tiers, backend, cooldown_seconds=30.0, max_retries=2):
+        self.tiers = {t.name: t for t in tiers}
+        self.backend = backend
+        self.cooldown_seconds = cooldown_seconds
+        self.max_retries = max_retries
+
+    def tier_for(self, task):
+        return self.tiers[TASK_TIERS.get(task, task)]
+
+    def cache_scope(self, task):
+        """
+        What a cached `task` result depends on besides the prompt: the backend
+        and the tier's models, so fake-backend replies never serve a real run.
+        """
+        return [type(self.backend).__name__, *self.tier_for(task).models]
+
+    def _candidates(self, tier):
+        """Tier models (healthy first), then the other tiers' models as fallback."""
+        own = sorted(tier.models, key=lambda m: not tier.stats[m].available())
+        candidates = [(tier, m) for m in own]
+        for other in self.tiers.values():
+            if other is not tier:
+                candidates += [(other, m) for m in other.models if m not in tier.models]
+        return candidates
+
+    def _attempt(self, owner, model, prompt, json_output, temperature):
+        """One call to `model`, accounted to the tier that owns it."""
+        stats = owner.stats[model]
+        start = time.perf_counter()
+        try:
+            text = self.backend.generate(
+                model, prompt, json_output=json_output,
+                temperature=temperature, timeout=owner.timeout,
+            )
+        except Exception as e:
+            latency = time.perf_counter() - start
+            stats.record(latency, 0, ok=False)
+            owner.limiter.observe(latency, classify_error(e))
+            raise
+
+        latency = time.perf_counter() - start
+        slow = latency > owner.timeout
+        stats.record(latency, len(prompt) + len(text), ok=True, slow=slow)
+        owner.limiter.observe(latency, OK)
+        if slow:
+            # Keep the answer, but steer the next requests elsewhere.
+            stats.cool_down(self.cooldown_seconds)
+        return text
+
+    def generate(self, task, prompt, json_output=False, temperature=0.2):
+        """Run `prompt` on the tier serving `task`, retrying and failing over between models."""
+        tier = self.tier_for(task)
+        last_error = None
+
+        for owner, model in self._candidates(tier):
+            borrowed = owner is not tier
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    time.sleep(owner.limiter.backoff(attempt))
+                outcome = None
+                # Slots are taken per attempt: after a 429 the slot is given
+                # back and the retry waits until the (now lower) limit allows
+                # it, ahead of requests that have not been tried yet.
+                with tier.limiter.slot(retry=attempt > 0):
+                    # Borrowing another tier's model also takes one of that
+                    # tier's slots. Never block on it: waiting while holding our
+                    # own slot could deadlock two tiers failing over into each other.
+                    if borrowed and not owner.limiter.try_acquire():
+                        break
+                    try:
+                        return self._attempt(owner, model, prompt, json_output, temperature)
+                    except Exception as e:
+                        if not is_retryable(e):
+                            raise
+                        last_error = e
+                        outcome = classify_error(e)
+                    finally:
+                        if borrowed:
+                            owner.limiter.release()
+                if outcome not in CONGESTION:
+                    break
+            else:
+                # Every retry on this model hit congestion. A 429 does not say
+                # whether it was concurrency or an exhausted quota, so only a
+                # model that stays overloaded after the limiter has backed off
+                # is taken out of rotation for the next requests.
+                owner.stats[model].cool_down(self.cooldown_seconds)
+
+        raise RuntimeError(f"All models failed for task '{task}': {last_error}")
+
+    def stats(self):
+        return {
+            name: {model: s.snapshot() for model, s in tier.stats.items()}
+            for name, tier in self.tiers.items()
+        }
+
+    def limits(self):
+        """Adaptive concurrency state per tier."""
+        return {name: tier.limiter.snapshot() for name, tier in self.tiers.items()}
+
+
+_default_router = None
+_default_lock = threading.Lock()
+
+
+def build_router(backend=None):
+    """Router with tiers configured from Config."""
+    if backend is None:
+        backend = FakeBackend() if Config.MODEL_BACKEND == "fake" else GeminiBackend()
+    tiers = [
+        Tier("fast", Config.FAST_MODELS, Config.FAST_CONCURRENCY,
+             Config.FAST_TIMEOUT, Config.FAST_COST_PER_1K_CHARS,
+             Config.FAST_MAX_CONCURRENCY, Config.FAST_TARGET_LATENCY),
+        Tier("strong", Config.STRONG_MODELS, Config.STRONG_CONCURRENCY,
+             Config.STRONG_TIMEOUT, Config.STRONG_COST_PER_1K_CHARS,
+             Config.STRONG_MAX_CONCURRENCY, Config.STRONG_TARGET_LATENCY),
+    ]
+    return ModelRouter(
+        tiers, backend,
+        cooldown_seconds=Config.MODEL_COOLDOWN_SECONDS,
+        max_retries=Config.GEMINI_MAX_RETRIES,
+    )
+
+
+def get_router():
+    """Process-wide router (created on first use)."""
+    global _default_router
+    with _default_lock:
+        if _default_router is None:
+            _default_router = build_router()
+        return _default_router
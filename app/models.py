@@ -0,0 +1,200 @@
+# models.py
+"""
+Typed, compact testcase records.
+
+Testcase.from_dict() is the single place raw model/JSON output is parsed;
+missing or malformed fields become safe defaults instead of KeyErrors later.
+to_dict() writes back only the fields the input had (text normalized to
+strings, steps to {content, expected} objects) plus unknown keys kept in
+`extra`; display fallbacks such as "Untitled" never reach the output.
+Records are treated as immutable once built (the digest is cached).
+
+TestcaseColumns is a columnar view (titles, priorities, flattened step
+arrays + offsets) that the exporters and UI metrics read from, so they work
+on flat arrays instead of re-walking nested records.
+"""
+import json
+import hashlib
+
+TESTCASE_KEYS = ("title", "priority_id", "custom_preconds", "custom_steps_separated")
+
+
+def _text(value):
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+class Step:
+    __slots__ = ("content", "expected")
+
+    def __init__(self, content="", expected=""):
+        self.content = content
+        self.expected = expected
+
+    @classmethod
+    def from_raw(cls, raw):
+        if isinstance(raw, dict):
+            return cls(_text(raw.get("content")), _text(raw.get("expected")))
+        return cls(_text(raw), "")
+
+    def to_dict(self):
+        return {"content": self.content, "expected": self.expected}
+
+    def __eq__(self, other):
+        return isinstance(other, Step) and (self.content, self.expected) == (other.content, other.expected)
+
+    def __hash__(self):
+        return hash((self.content, self.expected))
+
+    def __repr__(self):
+        return f"Step({self.content!r}, {self.expected!r})"
+
+
+class Testcase:
+    __slots__ = ("title", "priority_id", "custom_preconds", "steps", "extra", "_present", "_digest")
+
+    def __init__(self, title="", priority_id=None, custom_preconds="", steps=(), extra=None, present=None):
+        self.title = title
+        self.priority_id = priority_id
+        self.custom_preconds = custom_preconds
+        self.steps = tuple(steps)
+        self.extra = extra or {}
+        # Known keys to write back in to_dict(); None means all of them
+        self._present = TESTCASE_KEYS if present is None else tuple(k for k in TESTCASE_KEYS if k in present)
+        self._digest = None
+
+    @classmethod
+    def from_dict(cls, raw):
+        """Parse one raw testcase dict; tolerant of missing or mistyped fields."""
+        if isinstance(raw, Testcase):
+            return raw
+        if not isinstance(raw, dict):
+            raise TypeError(f"Testcase must be a JSON object, got {type(raw).__name__}.")
+
+        steps = raw.get("custom_steps_separated") or []
+        if not isinstance(steps, list):
+            steps = [steps]
+
+        return cls(
+            title=_text(raw.get("title")),
+            priority_id=raw.get("priority_id"),
+            custom_preconds=_text(raw.get("custom_preconds")),
+            steps=[Step.from_raw(s) for s in steps],
+            extra={k: v for k, v in raw.items() if k not in TESTCASE_KEYS},
+            present=raw.keys(),
+        )
+
+    @property
+    def display_title(self):
+        return self.title or "Untitled"
+
+    def to_dict(self):
+        fields = {
+            "title": self.title,
+            "priority_id": self.priority_id,
+            "custom_preconds": self.custom_preconds,
+            "custom_steps_separated": [s.to_dict() for s in self.steps],
+        }
+        return {**{k: fields[k] for k in self._present}, **self.extra}
+
+    @property
+    def digest(self):
+        """SHA-256 of the canonical JSON form; computed once, used for dedup/caching."""
+        if self._digest is None:
+            payload = json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":"), default=str)
+            self._digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return self._digest
+
+    def __eq__(self, other):
+        return isinstance(other, Testcase) and self.digest == other.digest
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __repr__(self):
+        return f"Testcase({self.display_title!r}, steps={len(self.steps)})"
+
+
+def parse_testcases(raw_list):
+    """Parse a list of raw testcases, skipping entries that are not objects."""
+    parsed = []
+    for raw in raw_list or []:
+        try:
+            parsed.append(Testcase.from_dict(raw))
+        except TypeError:
+            continue
+    return parsed
+
+
+def dedupe(testcases):
+    """Drop exact duplicates, keeping first occurrence order."""
+    return list(dict.fromkeys(testcases))
+
+
+class TestcaseColumns:
+    """
+    Columnar view of a testcase list.
+
+    Steps of testcase i live at step_contents[step_offsets[i]:step_offsets[i+1]].
+    Numeric columns are numpy arrays (imported on first use). `records` keeps
+    the source list (no copy) for consumers that need whole records, e.g. JSON.
+    """
+
+    __slots__ = ("records", "titles", "preconds", "priorities", "step_counts",
+                 "step_offsets", "step_contents", "step_expected")
+
+    def __init__(self, testcases):
+        import numpy as np
+
+        testcases = list(testcases)
+        self.records = testcases
+        self.titles = [tc.display_title for tc in testcases]
+        self.preconds = [tc.custom_preconds for tc in testcases]
+        self.priorities = np.fromiter((_priority(tc.priority_id) for tc in testcases),
+                                      dtype=np.int32, count=len(testcases))
+        self.step_counts = np.fromiter((len(tc.steps) for tc in testcases), dtype=np.int32, count=len(testcases))
+        self.step_offsets = np.concatenate(([0], np.cumsum(self.step_counts)))
+        self.step_contents = [s.content for tc in testcases for s in tc.steps]
+        self.step_expected = [s.expected for tc in testcases for s in tc.steps]
+
+    def __len__(self):
+        return len(self.titles)
+
+    @property
+    def total_steps(self):
+        return int(self.step_offsets[-1])
+
+    @property
+    def avg_steps(self):
+        return float(self.step_counts.mean()) if len(self) else 0.0
+
+    def steps_of(self, i):
+        start, end = self.step_offsets[i], self.step_offsets[i + 1]
+        return self.step_contents[start:end], self.step_expected[start:end]
+
+    def priority_counts(self):
+        """{priority_id: count}; unparseable priorities are counted under 0."""
+        import numpy as np
+
+        values, counts = np.unique(self.priorities, return_counts=True)
+        return dict(zip(values.tolist(), counts.tolist()))
+
+
+def as_columns(data):
+    """Columnar view of `data` (raw dicts, Testcase records or an existing view)."""
+    if isinstance(data, TestcaseColumns):
+        return data
+    return TestcaseColumns(parse_testcases(data))
+
+
+_PRIORITY_MAX = 2**31 - 1
+
+
+def _priority(value):
+    """Integer priority for the int32 column; anything unparseable becomes 0."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return 0
+    return max(-_PRIORITY_MAX, min(_PRIORITY_MAX, value))
@@ -4,15 +4,22 @@
 
 import streamlit as st
 import json
-import google.generativeai as genai
-import pandas as pd
-import numpy as np
-import zipfile
-import io
 import re
+import sys
 import logging
 from pathlib import Path
-from config import Config
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.config import Config
+from app.model_router import get_router
+from app.cache import get_cache, make_key
+from app.export_testcases import FORMATS, build_zip_bundle
+from app.improve_scenarios import flag_scenarios, improve_scenarios
+from app.models import Testcase, TestcaseColumns, dedupe
+from app.concurrency import run_batch
 
 # -----------------------------------------------------------------------------
 # App Config & Setup
@@ -24,8 +31,9 @@ st.set_page_config(
     page_icon="🧪"
 )
 
+# Runs once per process; Streamlit reruns hit the already-initialized state.
+# The Gemini SDK itself is imported lazily on the first model call.
 Config.ensure_dirs()
-genai.configure(api_key=Config.GEMINI_API_KEY)
 
 logger = logging.getLogger("streamlit_app")
 logger.setLevel(logging.INFO)
@@ -126,20 +134,10 @@ textarea {
 # Gemini Helper Functions
 # -----------------------------------------------------------------------------
 
-def call_gemini(model, prompt, json_output=False, temperature=0.2):
-    """Call Gemini model and return text or JSON."""
-    m = genai.GenerativeModel(model)
-
+def call_gemini(router, task, prompt, json_output=False, temperature=0.2):
+    """Route the prompt to the tier serving `task` and return the text."""
     try:
-        if json_output:
-            resp = m.generate_content(
-                prompt,
-                generation_config={"temperature": temperature, "response_mime_type": "application/json"}
-            )
-        else:
-            resp = m.generate_content(prompt, generation_config={"temperature": temperature})
-
-        return getattr(resp, "text", "")
+        return router.generate(task, prompt, json_output=json_output, temperature=temperature)
     except Exception as e:
         logger.error(f"Gemini error: {e}")
         raise
@@ -159,7 +157,24 @@ def try_parse_json(text):
         raise RuntimeError("Invalid JSON returned by model.")
 
 
-def generate_scenarios(model, context, n, temp):
+# The parsers below raise instead of returning an unusable value, so a bad
+# reply is never written to the shared cache and replayed to other sessions.
+
+def parse_scenarios(text):
+    scenarios = extract_numbered(text)
+    if not scenarios:
+        raise RuntimeError("No scenarios returned by model.")
+    return scenarios
+
+
+def parse_testcase(text):
+    data = try_parse_json(text)
+    if not isinstance(data, dict):
+        raise RuntimeError(f"Testcase must be a JSON object, got {type(data).__name__}.")
+    return data
+
+
+def generate_scenarios(router, context, n, temp, refresh=False):
     prompt = f"""
 Generate {n} QA test scenarios.
 
@@ -170,11 +185,14 @@ Rules:
 - Only numbered lines (1., 2., 3.)
 - No explanation
 """
-    raw = call_gemini(model, prompt, temperature=temp)
-    return extract_numbered(raw)
+    return get_cache().get_or_compute(
+        make_key("ui.scenarios", router.cache_scope("scenarios"), temp, prompt),
+        lambda: parse_scenarios(call_gemini(router, "scenarios", prompt, temperature=temp)),
+        refresh=refresh,
+    )
 
 
-def generate_testcase(model, context, scenario, temp):
+def generate_testcase(router, context, scenario, temp, refresh=False):
     prompt = f"""
 Generate a detailed QA TESTCASE in pure JSON.
 
@@ -193,8 +211,11 @@ JSON must include:
     - expected
 Return ONLY JSON.
 """
-    raw = call_gemini(model, prompt, json_output=True, temperature=temp)
-    return try_parse_json(raw)
+    return get_cache().get_or_compute(
+        make_key("ui.testcase", router.cache_scope("testcase"), temp, prompt),
+        lambda: parse_testcase(call_gemini(router, "testcase", prompt, json_output=True, temperature=temp)),
+        refresh=refresh,
+    )
 
 
 # -----------------------------------------------------------------------------
@@ -203,13 +224,35 @@ Return ONLY JSON.
 
 st.sidebar.title("⚙️ Configuration")
 
-st.sidebar.markdown("### Model")
-st.sidebar.success("Gemini 2.5 Flash (default)")
-model_choice = "models/gemini-2.5-flash"
+st.sidebar.markdown("### Models")
+router = get_router()
+for tier in router.tiers.values():
+    st.sidebar.success(f"{tier.name.title()}: {', '.join(tier.models)}")
 
 temperature = st.sidebar.slider("Temperature", 0.0, 1.0, 0.2)
 num_scenarios = st.sidebar.slider("Number of Scenarios", 1, 20, 5)
 export_formats = st.sidebar.multiselect("Export Formats", ["JSON", "CSV", "Markdown"], default=["JSON", "CSV"])
+regenerate = st.sidebar.checkbox(
+    "🔄 Regenerate (bypass cache)",
+    value=False,
+    help="Ask the model again instead of reusing cached results; the new results replace the cached ones."
+)
+
+with st.sidebar.expander("📊 Model Usage"):
+    for tier_name, lim in router.limits().items():
+        st.markdown(
+            f"**{tier_name}** · limit {lim['limit']} · in flight {lim['inflight']}  \n"
+            f"p50 {lim['p50_latency_s']:.2f}s · p95 {lim['p95_latency_s']:.2f}s · "
+            f"{lim['throttled']} throttled · {lim['server_error']} 5xx · {lim['timeout']} timeouts"
+        )
+    for tier_name, models in router.stats().items():
+        for model, stats in models.items():
+            if stats["calls"]:
+                st.markdown(
+                    f"**{tier_name}** · `{model}`  \n"
+                    f"{stats['calls']} calls · {stats['failures']} failed · "
+                    f"avg {stats['avg_latency_s']:.2f}s · est. ${stats['est_cost']:.4f}"
+                )
 
 
 # -----------------------------------------------------------------------------
@@ -241,9 +284,11 @@ with left:
             st.error("Please enter context.")
         else:
             try:
-                scenarios = generate_scenarios(model_choice, context_text, num_scenarios, temperature)
+                scenarios = generate_scenarios(router, context_text, num_scenarios, temperature, refresh=regenerate)
                 st.session_state["scenarios"] = scenarios
                 st.session_state.pop("testcases", None)
+                st.session_state.pop("tc_columns", None)
+                st.session_state.pop("tc_duplicates", None)
                 st.success("Scenarios generated!")
             except Exception as e:
                 st.error(f"Error: {e}")
@@ -252,10 +297,32 @@ with left:
     if "scenarios" in st.session_state:
         st.markdown("<h2 class='section-title'>✍️ Edit Scenarios</h2>", unsafe_allow_html=True)
 
+        # Improve runs before the editor widgets are created so their values can be replaced.
+        only_flagged = st.checkbox("Only improve flagged scenarios", value=True)
+        if st.button("✨ Improve Scenarios"):
+            current = [
+                st.session_state.get(f"sc_{i}", sc)
+                for i, sc in enumerate(st.session_state["scenarios"])
+            ]
+            with st.spinner("Improving scenarios..."):
+                improved, changed, errors = improve_scenarios(
+                    router, context_text, current, only_flagged=only_flagged, temperature=temperature
+                )
+            st.session_state["scenarios"] = improved
+            for i in range(len(improved)):
+                st.session_state.pop(f"sc_{i}", None)
+            st.success(f"Improved {len(changed)} scenario(s).")
+            for err in errors:
+                st.error(f"Scenario:\n{err['scenario']}\n\nError:\n{err['error']}")
+
+        flagged = flag_scenarios(st.session_state["scenarios"])
         edited_list = []
 
         for idx, sc in enumerate(st.session_state["scenarios"]):
-            with st.expander(f"Scenario {idx+1}", expanded=True):
+            label = f"Scenario {idx+1}" + (" ⚠️" if idx in flagged else "")
+            with st.expander(label, expanded=True):
+                if idx in flagged:
+                    st.caption(flagged[idx])
                 txt = st.text_area(
                     "",
                     value=sc,
@@ -287,14 +354,23 @@ with right:
             errors = []
 
             with st.spinner("Generating testcases..."):
-                for sc in st.session_state["scenarios"]:
-                    try:
-                        tc = generate_testcase(model_choice, context_text, sc, temperature)
+                scenarios = st.session_state["scenarios"]
+                results = run_batch(
+                    lambda sc: Testcase.from_dict(generate_testcase(router, context_text, sc, temperature, refresh=regenerate)),
+                    scenarios,
+                    router.tier_for("testcase").limiter.max_limit,
+                )
+                for sc, (tc, err) in zip(scenarios, results):
+                    if err is not None:
+                        errors.append({"scenario": sc, "error": str(err)})
+                    else:
                         tcs.append(tc)
-                    except Exception as e:
-                        errors.append({"scenario": sc, "error": str(e)})
 
+            unique = dedupe(tcs)
+            st.session_state["tc_duplicates"] = len(tcs) - len(unique)
+            tcs = unique
             st.session_state["testcases"] = tcs
+            st.session_state["tc_columns"] = TestcaseColumns(tcs)
             st.session_state["tc_errors"] = errors
 
     # Testcases Viewer
@@ -303,81 +379,60 @@ with right:
 
         st.markdown("<h2 class='section-title'>📦 Testcases</h2>", unsafe_allow_html=True)
 
+        duplicates = st.session_state.get("tc_duplicates", 0)
+        if duplicates:
+            st.info(f"Removed {duplicates} duplicate testcase(s): different scenarios produced identical testcases.")
+
         for idx, tc in enumerate(tcs):
-            with st.expander(f"Testcase {idx+1}: {tc.get('title','Untitled')}"):
+            with st.expander(f"Testcase {idx+1}: {tc.display_title}"):
                 t1, t2, t3 = st.tabs(["🧩 JSON", "📄 Markdown", "📋 Steps"])
 
                 with t1:
-                    st.json(tc)
+                    st.json(tc.to_dict())
 
                 with t2:
-                    md = f"### {tc['title']}\n\n"
-                    md += f"**Preconditions:** {tc['custom_preconds']}\n\n"
+                    md = f"### {tc.display_title}\n\n"
+                    md += f"**Preconditions:** {tc.custom_preconds}\n\n"
                     md += "### Steps:\n"
-                    for s in tc["custom_steps_separated"]:
-                        md += f"- {s['content']} → *{s['expected']}*\n"
+                    for s in tc.steps:
+                        md += f"- {s.content} → *{s.expected}*\n"
                     st.markdown(md)
 
                 with t3:
-                    for s in tc["custom_steps_separated"]:
+                    for s in tc.steps:
                         st.markdown(
-                            f"<div class='glass-card'><b>{s['content']}</b><br>→ {s['expected']}</div>",
+                            f"<div class='glass-card'><b>{s.content}</b><br>→ {s.expected}</div>",
                             unsafe_allow_html=True
                         )
 
         # Coverage Metrics
         st.markdown("<h2 class='section-title'>📈 Coverage Metrics</h2>", unsafe_allow_html=True)
 
-        num_cases = len(tcs)
-        num_steps = sum(len(tc["custom_steps_separated"]) for tc in tcs)
-        avg_steps = num_steps / num_cases if num_cases else 0
+        cols = st.session_state.get("tc_columns")
+        if cols is None:
+            cols = st.session_state["tc_columns"] = TestcaseColumns(tcs)
+        num_cases = len(cols)
+        num_steps = cols.total_steps
+        avg_steps = cols.avg_steps
         score = min(100.0, num_steps * 3.0)
 
         c1, c2, c3 = st.columns(3)
         c1.metric("Testcases", num_cases)
         c2.metric("Total Steps", num_steps)
         c3.metric("Coverage Score", f"{score:.1f}%")
+        st.caption(
+            f"Avg steps per testcase: {avg_steps:.1f} · Priorities: "
+            + " · ".join(f"P{p}: {n}" for p, n in cols.priority_counts().items())
+        )
 
         # Export ZIP
         st.markdown("<h2 class='section-title'>📤 Export</h2>", unsafe_allow_html=True)
 
         if st.button("📦 Create ZIP Bundle"):
-            buffer = io.BytesIO()
-
-            with zipfile.ZipFile(buffer, "w") as z:
-                # JSON
-                z.writestr("testcases.json", json.dumps(tcs, indent=4))
-
-                # CSV
-                rows = []
-                for tc in tcs:
-                    for s in tc["custom_steps_separated"]:
-                        rows.append({
-                            "title": tc["title"],
-                            "preconditions": tc["custom_preconds"],
-                            "step": s["content"],
-                            "expected": s["expected"]
-                        })
-                df = pd.DataFrame(rows)
-                z.writestr("testcases.csv", df.to_csv(index=False))
-
-                # Markdown
-                md_full = ""
-                for tc in tcs:
-                    md_full += f"## {tc['title']}\n"
-                    md_full += f"{tc['custom_preconds']}\n\n"
-                    for s in tc["custom_steps_separated"]:
-                        md_full += f"- {s['content']} → {s['expected']}\n"
-                    md_full += "\n---\n"
-                z.writestr("testcases.md", md_full)
-
-                # Summary
-                z.writestr("summary.txt", f"Generated {num_cases} testcases.")
-
-            buffer.seek(0)
+            formats = [f for f in export_formats if f in FORMATS]
             st.download_button(
                 "⬇️ Download ZIP",
-                data=buffer.getvalue(),
+                data=build_zip_bundle(cols, formats),
                 file_name="testcases_bundle.zip",
                 mime="application/zip"
             )
@@ -1,4 +1,6 @@
 # utils/validations.py
+import re
+
 
 def validate_context(text: str) -> tuple[bool, str]:
     """
@@ -43,3 +45,37 @@ def validate_scenario_text(text: str) -> tuple[bool, str]:
         return False, "Scenario too short. Please add more detail."
 
     return True, ""
+
+
+# "correctly"/"properly" are left out: good rewrites use them too ("…is handled correctly")
+VAGUE_WORDS = {"etc", "something", "stuff", "things", "somehow", "fine"}
+
+
+def check_scenario_quality(text: str) -> tuple[bool, str]:
+    """
+    Cheap heuristic for scenarios worth sending to "Improve Scenario".
+    Returns (is_good, reason)
+    """
+
+    is_valid, message = validate_scenario_text(text)
+    if not is_valid:
+        return False, message
+
+    # Ignore list numbering ("1. ", "2) ") carried over from generated output
+    text = re.sub(r"^\s*\d+[.)]\s*", "", text)
+    words = re.findall(r"[A-Za-z']+", text.lower())
+
+    if len(words) < 5:
+        return False, "Scenario is too brief to be testable."
+
+    if len(words) > 60:
+        return False, "Scenario is too long; it likely mixes several cases."
+
+    vague = sorted(VAGUE_WORDS.intersection(words))
+    if vague:
+        return False, f"Scenario uses vague wording: {', '.join(vague)}."
+
+    if not text.strip() or not text.strip()[0].isupper():
+        return False, "Scenario should start with a capitalized action."
+
+    return True, ""
@@ -0,0 +1,101 @@
+# benchmarks/bench_startup.py
+"""
+Startup benchmark.
+
+  cold    — wall time of a fresh interpreter importing each app module
+            (median of N runs), plus the interpreter baseline for reference
+  rerun   — per-interaction latency of the Streamlit script, measured with
+            streamlit.testing.AppTest (skipped if streamlit is not installed)
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--max-cold-ms 400] [--max-rerun-ms 150]
+
+Exits non-zero when a budget is exceeded, so it can gate CI.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODULES = [
+    "app.config",
+    "app.cache",
+    "app.export_testcases",
+    "app.gemini_generator",
+]
+
+
+def time_cold_import(module, runs):
+    cmd = [sys.executable, "-c", f"import {module}" if module else "pass"]
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+        samples.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+    return statistics.median(samples), ""
+
+
+def time_reruns(runs):
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return None, None
+
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    at = AppTest.from_file(str(ROOT / "app" / "streamlit_app.py"), default_timeout=30)
+
+    start = time.perf_counter()
+    at.run()
+    first = (time.perf_counter() - start) * 1000
+
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        samples.append((time.perf_counter() - start) * 1000)
+    return first, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-cold-ms", type=float, default=None)
+    parser.add_argument("--max-rerun-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    failed = False
+
+    print("=== COLD START (median ms, includes interpreter) ===")
+    baseline, _ = time_cold_import("", args.runs)
+    print(f"{'<interpreter>':28s} {baseline:8.1f}")
+    for module in MODULES:
+        ms, err = time_cold_import(module, args.runs)
+        if ms is None:
+            print(f"{module:28s}  skipped ({err})")
+            continue
+        over = args.max_cold_ms is not None and ms > args.max_cold_ms
+        failed |= over
+        print(f"{module:28s} {ms:8.1f}{'  OVER BUDGET' if over else ''}")
+
+    print("\n=== STREAMLIT RERUN (ms) ===")
+    first, rerun = time_reruns(args.runs)
+    if first is None:
+        print("skipped (streamlit not installed)")
+    else:
+        over = args.max_rerun_ms is not None and rerun > args.max_rerun_ms
+        failed |= over
+        print(f"{'first run':28s} {first:8.1f}")
+        print(f"{'rerun (median)':28s} {rerun:8.1f}{'  OVER BUDGET' if over else ''}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,52 @@
 # main.py
-import subprocess
+import importlib
+import time
 from pathlib import Path
 import sys
 
 # Absolute folder where main.py exists
 BASE_DIR = Path(__file__).resolve().parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
 print(">>> MAIN running from:", BASE_DIR)
 
-def run(script_name, desc):
+def run(module_name, desc):
     print("\n" + "=" * 60)
     print(desc)
     print("=" * 60)
 
-    script_path = BASE_DIR / script_name
-
-    if not script_path.exists():
-        print(f"❌ Script NOT found: {script_path}")
-        return False
-
-    # Build command using LIST form (Windows-safe)
-    cmd = [sys.executable, str(script_path)]
-    print("👉 Running:", cmd)
+    # Steps run in this interpreter: config, cache and the Gemini SDK are
+    # imported once for the whole pipeline instead of once per step.
+    print("👉 Running:", module_name)
+    start = time.perf_counter()
 
     try:
-        result = subprocess.run(cmd, shell=False)
-    except Exception as e:
-        print("❌ Subprocess error:", e)
+        module = importlib.import_module(module_name)
+        module.main()
+    except ModuleNotFoundError as e:
+        print(f"❌ Module NOT found: {e.name}")
         return False
-
-    if result.returncode != 0:
-        print(f"❌ FAILED: {desc} (exit {result.returncode})")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print(f"❌ FAILED: {desc} (exit {e.code})")
+            return False
+    except Exception as e:
+        print(f"❌ FAILED: {desc} ({e})")
         return False
 
-    print(f"✔ SUCCESS: {desc}")
+    print(f"✔ SUCCESS: {desc} ({time.perf_counter() - start:.2f}s)")
     return True
 
 
 def main():
     steps = [
-        ("gemini_generator.py", "Step 1: Generate Test Cases"),
-        ("json_cleanup.py", "Step 2: Clean JSON"),
-        ("export_testcases.py", "Step 3: Export Testcases")
+        ("app.gemini_generator", "Step 1: Generate Test Cases"),
+        ("app.json_cleanup", "Step 2: Clean JSON"),
+        ("app.export_testcases", "Step 3: Export Testcases")
     ]
 
-    for script, desc in steps:
-        if not run(script, desc):
+    for module_name, desc in steps:
+        if not run(module_name, desc):
             print("\n❌ Pipeline stopped.")
             return
 